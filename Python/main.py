@@ -55,65 +55,35 @@ def setup_logging():
 def ensure_directories():
     """确保必要的目录结构存在"""
     # 尝试从配置文件加载路径信息
-    paths_info = load_paths_from_config()
+    paths_info = load_paths_from_config() or {}
 
     # 使用相对路径而不是绝对路径，提高环境适应性
     current_dir = Path(__file__).parent  # Python目录
 
-    # 获取目录配置 - 优先使用环境变量，其次使用配置文件，最后使用相对路径
-    screenshots_dir = os.getenv("SCREENSHOTS_DIR")
-    outputs_dir = os.getenv("OUTPUTS_DIR")
-    logs_dir = os.getenv("LOGS_DIR")
-
-    # 如果环境变量未设置，尝试使用配置文件中的路径
-    if not screenshots_dir and paths_info and 'screenshots_dir' in paths_info:
-        screenshots_dir = paths_info['screenshots_dir']
-        logger.info(f"使用配置文件中的Screenshots目录: {screenshots_dir}")
-
-    if not outputs_dir and paths_info and 'outputs_dir' in paths_info:
-        outputs_dir = paths_info['outputs_dir']
-        logger.info(f"使用配置文件中的Outputs目录: {outputs_dir}")
-
-    if not logs_dir and paths_info and 'logs_dir' in paths_info:
-        logs_dir = paths_info['logs_dir']
-        logger.info(f"使用配置文件中的Logs目录: {logs_dir}")
-
-    # 如果配置文件也没有设置，使用相对路径
-    if not screenshots_dir:
-        screenshots_dir = current_dir.parent / "Screenshots"  # 默认为项目根目录下的Screenshots
-        logger.info(f"使用默认的Screenshots目录: {screenshots_dir}")
-    else:
-        screenshots_dir = Path(screenshots_dir)
-
-    if not outputs_dir:
-        outputs_dir = current_dir.parent / "Outputs"  # 默认为项目根目录下的Outputs
-        logger.info(f"使用默认的Outputs目录: {outputs_dir}")
-    else:
-        outputs_dir = Path(outputs_dir)
-
-    if not logs_dir:
-        logs_dir = current_dir / "logs"  # 默认为Python目录下的logs
-        logger.info(f"使用默认的Logs目录: {logs_dir}")
-    else:
-        logs_dir = Path(logs_dir)
+    # 目录解析表: 名称 -> (环境变量, 配置文件键, 默认路径)
+    config = {
+        "Screenshots": ("SCREENSHOTS_DIR", "screenshots_dir", current_dir.parent / "Screenshots"),
+        "Outputs": ("OUTPUTS_DIR", "outputs_dir", current_dir.parent / "Outputs"),
+        "Logs": ("LOGS_DIR", "logs_dir", current_dir / "logs"),
+        "Temp": (None, None, current_dir / "temp")  # 临时目录，用于存储上传的临时文件
+    }
 
-    # 确保所有必要的目录都存在
-    directories = {
-        "Screenshots": screenshots_dir,
-        "Outputs": outputs_dir,
-        "Logs": logs_dir,
-        "Temp": current_dir / "temp"  # 临时目录，用于存储上传的临时文件
+    # 解析优先级: 环境变量 > 配置文件 > 默认相对路径
+    resolved = {
+        name: Path((env and os.getenv(env)) or (key and paths_info.get(key)) or default)
+        for name, (env, key, default) in config.items()
     }
 
-    # 检查并创建所有目录
-    for name, path in directories.items():
+    # 一次性创建所有目录（makedirs本身幂等，无需先stat检查）
+    for path in resolved.values():
         try:
-            ensure_dir_exists(path)
-            logger.info(f"{name} 目录已确认存在: {path}")
+            os.makedirs(path, exist_ok=True)
         except Exception as e:
-            logger.error(f"创建 {name} 目录时出错: {str(e)}")
+            logger.error(f"创建目录时出错: {path}: {str(e)}")
+
+    logger.info("目录已确认存在: %s", ", ".join(str(p) for p in resolved.values()))
 
-    return screenshots_dir, outputs_dir
+    return resolved["Screenshots"], resolved["Outputs"]
 
 def start_streamlit():
     """启动Streamlit UI界面"""
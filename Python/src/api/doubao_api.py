@@ -5,16 +5,29 @@
 
 import os
 import json
+import shutil
 import logging
 import requests
-from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter, Retry
 
-# 加载环境变量
-load_dotenv()
+# 环境变量由主程序入口统一加载（main.py中的load_dotenv），避免重复解析.env文件
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 豆包API支持的生成尺寸
+SUPPORTED_SIZES = (
+    "1024x1024",  # 1:1
+    "1152x864",   # 4:3
+    "864x1152",   # 3:4
+    "1280x720",   # 16:9
+    "720x1280",   # 9:16
+    "1248x832",   # 3:2
+    "832x1248",   # 2:3
+    "1512x648"    # 7:3
+)
+_VALID_SIZES = frozenset(SUPPORTED_SIZES)
+
 class DoubaoAPI:
     """豆包API客户端类"""
 
@@ -27,6 +40,19 @@ class DoubaoAPI:
         if not self.api_key or not self.api_url or not self.model:
             raise ValueError("缺少必要的API配置，请检查.env文件")
 
+        # 创建复用的会话，启用HTTP keep-alive和连接池，避免每次请求都重新建立TCP+TLS连接
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        })
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            max_retries=Retry(total=3, backoff_factor=0.3,
+                              status_forcelist=[429, 500, 502, 503, 504])
+        ))
+
         logger.info(f"豆包API客户端初始化完成，使用模型: {self.model}")
 
     def generate_image(self, prompt, size="1024x1024", response_format="url",
@@ -47,26 +73,10 @@ class DoubaoAPI:
             dict: 包含生成图片URL或base64数据的响应
         """
         # 验证尺寸参数
-        valid_sizes = [
-            "1024x1024",  # 1:1
-            "1152x864",   # 4:3
-            "864x1152",   # 3:4
-            "1280x720",   # 16:9
-            "720x1280",   # 9:16
-            "1248x832",   # 3:2
-            "832x1248",   # 2:3
-            "1512x648"    # 7:3
-        ]
-
-        if size not in valid_sizes:
+        if size not in _VALID_SIZES:
             logger.warning(f"不支持的尺寸: {size}，将使用默认尺寸1024x1024")
             size = "1024x1024"
 
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
-
         payload = {
             "model": self.model,
             "prompt": prompt,
@@ -78,14 +88,15 @@ class DoubaoAPI:
             "n": n
         }
 
-        logger.info(f"发送图片生成请求: prompt='{prompt}', size={size}")
+        logger.info("发送图片生成请求: prompt='%s', size=%s", prompt, size)
 
         try:
-            response = requests.post(self.api_url, headers=headers, json=payload)
+            # 显式超时，避免单个卡死的请求无限期占用工作线程
+            response = self.session.post(self.api_url, json=payload, timeout=(5, 60))
             response.raise_for_status()  # 如果响应状态码不是200，抛出异常
 
             result = response.json()
-            logger.info(f"图片生成成功: {result.get('created')}")
+            logger.info("图片生成成功: %s", result.get('created'))
             return result
 
         except requests.exceptions.RequestException as e:
@@ -109,14 +120,15 @@ class DoubaoAPI:
             bool: 下载是否成功
         """
         try:
-            response = requests.get(url, stream=True)
-            response.raise_for_status()
+            # 流式写入磁盘，使用64KB缓冲区减少Python层的写入调用次数
+            with self.session.get(url, stream=True, timeout=(5, 60)) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True
 
-            with open(save_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+                with open(save_path, 'wb') as f:
+                    shutil.copyfileobj(response.raw, f, length=1 << 16)
 
-            logger.info(f"图片下载成功: {save_path}")
+            logger.info("图片下载成功: %s", save_path)
             return True
 
         except Exception as e:
@@ -124,6 +136,22 @@ class DoubaoAPI:
             return False
 
 
+# 模块级单例，保证监控器与UI共享同一个会话连接池
+_instance = None
+
+def get_instance():
+    """
+    获取模块级的DoubaoAPI单例
+
+    Returns:
+        DoubaoAPI: 进程内共享的API客户端实例
+    """
+    global _instance
+    if _instance is None:
+        _instance = DoubaoAPI()
+    return _instance
+
+
 # 测试代码
 if __name__ == "__main__":
     # 配置日志输出到控制台
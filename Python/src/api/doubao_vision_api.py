@@ -6,20 +6,28 @@
 import os
 import json
 import base64
+import hashlib
 import logging
+import threading
 import requests
+from requests.adapters import HTTPAdapter, Retry
 from pathlib import Path
-from dotenv import load_dotenv
 
 # 导入提示词模块
 from src.utils.prompt import SYSTEM_PROMPTS
 
-# 加载环境变量
-load_dotenv()
+# 环境变量由主程序入口统一加载（main.py中的load_dotenv），避免重复解析.env文件
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 上传前允许的最大边长，超过则先缩小（视觉API的high模式有效分辨率远低于4K）
+_MAX_UPLOAD_DIMENSION = 1536
+# 小于该体积的文件直接走原始字节快速编码路径
+_RAW_ENCODE_MAX_BYTES = 512 * 1024
+# 视觉分析结果缓存的最大条目数
+_PROMPT_CACHE_MAX = 128
+
 class DoubaoVisionAPI:
     """豆包视觉理解API客户端类"""
 
@@ -32,6 +40,23 @@ class DoubaoVisionAPI:
         if not self.api_key:
             raise ValueError("缺少必要的API配置，请检查.env文件")
 
+        # 创建复用的会话，启用HTTP keep-alive和连接池，避免每次请求都重新建立TCP+TLS连接
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        })
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            max_retries=Retry(total=3, backoff_factor=0.3,
+                              status_forcelist=[429, 500, 502, 503, 504])
+        ))
+
+        # 按图片内容哈希缓存分析结果，重复截图直接复用，跳过整个API往返
+        self._prompt_cache = {}
+        self._cache_lock = threading.Lock()
+
         logger.info(f"豆包视觉理解API客户端初始化完成，使用模型: {self.model}")
 
     def image_to_prompt(self, image_path, instruction=None):
@@ -45,18 +70,20 @@ class DoubaoVisionAPI:
         Returns:
             str: 生成的提示词
         """
-        # 将图片转换为Base64编码，并获取正确的格式
-        image_base64, img_format = self._encode_image(image_path)
-
         # 如果没有提供指导说明，使用默认值
         if not instruction:
             instruction = "请分析这张图片，生成一个详细的描述，可以用于AI图像生成。描述应该包括图片中的主要内容、场景、风格、色彩和氛围。"
 
-        # 构建请求头
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
+        # 按图片内容哈希查询缓存，重复截图直接复用分析结果
+        cache_key = (self._hash_image(image_path), instruction)
+        with self._cache_lock:
+            cached = self._prompt_cache.get(cache_key)
+        if cached is not None:
+            logger.info("命中视觉分析缓存: %s", Path(image_path).name)
+            return cached
+
+        # 将图片转换为Base64编码，并获取正确的格式
+        image_base64, img_format = self._encode_image(image_path)
 
         # 构建请求体，根据豆包API文档调整格式
         payload = {
@@ -87,17 +114,19 @@ class DoubaoVisionAPI:
             "max_tokens": 1000
         }
 
-        logger.info(f"发送图片分析请求: {Path(image_path).name}")
+        logger.info("发送图片分析请求: %s", Path(image_path).name)
 
         try:
-            response = requests.post(self.api_url, headers=headers, json=payload)
+            # 显式超时，避免单个卡死的请求无限期占用工作线程
+            response = self.session.post(self.api_url, json=payload, timeout=(5, 60))
 
-            # 记录请求和响应的详细信息，以便调试
-            logger.debug(f"请求URL: {self.api_url}")
-            logger.debug(f"请求头: {headers}")
-            logger.debug(f"请求体: {json.dumps(payload, ensure_ascii=False)}")
-            logger.debug(f"响应状态码: {response.status_code}")
-            logger.debug(f"响应内容: {response.text[:500]}...")  # 只记录前500个字符
+            # 仅在DEBUG级别时记录请求和响应的详细信息
+            # 注意不序列化完整请求体：其中的base64数据会产生数MB的字符串
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("请求URL: %s", self.api_url)
+                logger.debug("请求指令: %s, 图片数据长度: %d", instruction, len(image_base64))
+                logger.debug("响应状态码: %s", response.status_code)
+                logger.debug("响应内容: %s...", response.text[:500])  # 只记录前500个字符
 
             response.raise_for_status()  # 如果响应状态码不是200，抛出异常
 
@@ -106,14 +135,21 @@ class DoubaoVisionAPI:
             # 从响应中提取生成的提示词
             if "choices" in result and len(result["choices"]) > 0:
                 prompt = result["choices"][0]["message"]["content"]
-                logger.info(f"图片分析成功，生成提示词长度: {len(prompt)}")
+                logger.info("图片分析成功，生成提示词长度: %d", len(prompt))
 
                 # 记录token使用情况
                 if "usage" in result:
                     usage = result["usage"]
-                    logger.info(f"Token使用情况: 输入={usage.get('prompt_tokens', 0)}, "
-                               f"输出={usage.get('completion_tokens', 0)}, "
-                               f"总计={usage.get('total_tokens', 0)}")
+                    logger.info("Token使用情况: 输入=%s, 输出=%s, 总计=%s",
+                                usage.get('prompt_tokens', 0),
+                                usage.get('completion_tokens', 0),
+                                usage.get('total_tokens', 0))
+
+                # 缓存分析结果，超出容量时整体清空（简单且足够）
+                with self._cache_lock:
+                    if len(self._prompt_cache) >= _PROMPT_CACHE_MAX:
+                        self._prompt_cache.clear()
+                    self._prompt_cache[cache_key] = prompt
 
                 return prompt
             else:
@@ -132,6 +168,21 @@ class DoubaoVisionAPI:
             logger.error(f"图片分析过程中出错: {str(e)}")
             return None
 
+    def _hash_image(self, image_path):
+        """
+        计算图片内容的SHA-256摘要，用作缓存键
+
+        Args:
+            image_path (str): 图片路径
+
+        Returns:
+            str: 十六进制摘要字符串
+        """
+        with open(image_path, 'rb') as f:
+            if hasattr(hashlib, 'file_digest'):  # Python 3.11+提供C级哈希
+                return hashlib.file_digest(f, 'sha256').hexdigest()
+            return hashlib.sha256(f.read()).hexdigest()
+
     def _encode_image(self, image_path):
         """
         将图片编码为Base64字符串，并确保格式正确
@@ -144,12 +195,32 @@ class DoubaoVisionAPI:
             str: 图片格式（jpeg, png等）
         """
         try:
-            # 使用PIL打开图片，确保格式正确
+            path = Path(image_path)
+            suffix = path.suffix.lower().lstrip('.')
+
+            # 快速路径：已是支持格式且体积较小的文件直接读取原始字节编码，
+            # 避免PIL解码+重新编码整张图片的开销
+            if suffix in {'jpg', 'jpeg', 'png', 'webp'} and path.stat().st_size <= _RAW_ENCODE_MAX_BYTES:
+                with open(path, 'rb') as f:
+                    raw = f.read()
+                return base64.b64encode(raw).decode('ascii'), 'jpeg' if suffix == 'jpg' else suffix
+
+            # 大图或未知格式：使用PIL打开图片处理后再编码
             from PIL import Image
             import io
 
             # 打开图片
-            with Image.open(image_path) as img:
+            with Image.open(path) as img:
+                # 超大截图先缩小再统一转为JPEG，大幅减少上传字节数和服务端预处理时间
+                if max(img.size) > _MAX_UPLOAD_DIMENSION:
+                    img.thumbnail((_MAX_UPLOAD_DIMENSION, _MAX_UPLOAD_DIMENSION), Image.LANCZOS)
+                    if img.mode != "RGB":
+                        img = img.convert("RGB")
+                    buffer = io.BytesIO()
+                    img.save(buffer, format='JPEG', quality=85, optimize=True)
+                    # getvalue()直接取缓冲区内容，省去read()的一次完整拷贝
+                    return base64.b64encode(buffer.getvalue()).decode('ascii'), 'jpeg'
+
                 # 确定图片格式
                 img_format = img.format.lower() if img.format else "jpeg"
 
@@ -160,15 +231,30 @@ class DoubaoVisionAPI:
                 # 将图片保存到内存缓冲区
                 buffer = io.BytesIO()
                 img.save(buffer, format=img_format)
-                buffer.seek(0)
 
-                # 编码为Base64
-                return base64.b64encode(buffer.read()).decode('utf-8'), img_format
+                # 编码为Base64（getvalue()省去read()的一次完整拷贝）
+                return base64.b64encode(buffer.getvalue()).decode('ascii'), img_format
         except Exception as e:
             logger.error(f"图片编码失败: {str(e)}")
             raise
 
 
+# 模块级单例，保证监控器与UI共享同一个会话连接池和分析结果缓存
+_instance = None
+
+def get_instance():
+    """
+    获取模块级的DoubaoVisionAPI单例
+
+    Returns:
+        DoubaoVisionAPI: 进程内共享的视觉理解API客户端实例
+    """
+    global _instance
+    if _instance is None:
+        _instance = DoubaoVisionAPI()
+    return _instance
+
+
 # 测试代码
 if __name__ == "__main__":
     # 配置日志输出到控制台
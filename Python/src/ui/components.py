@@ -6,15 +6,103 @@ UI组件模块
 import os
 import io
 import base64
+import functools
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
 from pathlib import Path
 from PIL import Image
 from datetime import datetime
 
+# 优先使用pybase64（SIMD加速，对MB级图片编码快数倍），未安装时回退到标准库
+try:
+    import pybase64 as _b64
+except ImportError:
+    _b64 = base64
+
+# 可选组件：用单个图片选择控件替代每张图一个按钮，减少每次rerun序列化的widget数量
+try:
+    from streamlit_image_select import image_select
+except ImportError:
+    image_select = None
+
+# 分块编码的块大小：必须是3的倍数，保证各块的base64输出可以直接拼接
+_B64_CHUNK_BYTES = 3 * 65536
+
+@functools.lru_cache(maxsize=128)
+def _image_base64_cached(path_str, mtime_ns, size):
+    """按(路径, 修改时间, 大小)缓存的base64编码实现"""
+    # 分块流式编码，避免原始字节和base64结果同时整体驻留内存
+    buf = bytearray()
+    with open(path_str, "rb") as img_file:
+        while chunk := img_file.read(_B64_CHUNK_BYTES):
+            buf += _b64.b64encode(chunk)
+    return buf.decode('ascii')
+
 def get_image_base64(image_path):
-    """将图片转换为base64编码"""
-    with open(image_path, "rb") as img_file:
-        return base64.b64encode(img_file.read()).decode()
+    """将图片转换为base64编码（文件未变化时复用缓存结果，避免重复读盘和编码）"""
+    stat = os.stat(image_path)
+    return _image_base64_cached(os.fspath(image_path), stat.st_mtime_ns, stat.st_size)
+
+# 缩略图磁盘缓存：解码+缩放每个文件只做一次，后续rerun直接复用
+_THUMB_DIR = Path(__file__).parent.parent.parent / "temp" / ".thumbs"
+_THUMB_SIZE = (300, 300)
+
+def _thumb_path(img_path, stat):
+    """根据文件stat信息生成缩略图缓存路径（文件修改后mtime/size变化自动失效）"""
+    return _THUMB_DIR / f"{img_path.stem}_{stat.st_mtime_ns}_{stat.st_size}.webp"
+
+def _make_thumb(img_path, thumb):
+    """生成并保存一张WebP缩略图（WebP比PNG缩略图小约3倍）"""
+    _THUMB_DIR.mkdir(parents=True, exist_ok=True)
+    with Image.open(img_path) as img:
+        if img.format == 'JPEG':
+            # draft模式让libjpeg在DCT域按1/2、1/4、1/8比例解码，跳过大部分像素
+            img.draft('RGB', (_THUMB_SIZE[0] * 2, _THUMB_SIZE[1] * 2))
+        # 300px小图上BILINEAR与LANCZOS肉眼无差别，但缩放速度快约3倍
+        img.thumbnail(_THUMB_SIZE, Image.Resampling.BILINEAR)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGB")
+        img.save(thumb, "WEBP", quality=80)
+
+def _get_thumbnail(img_path):
+    """
+    获取图片的缩略图路径，缓存缺失时生成
+
+    Args:
+        img_path (Path): 原图路径
+
+    Returns:
+        Path: 缩略图路径；生成失败时返回原图路径
+    """
+    try:
+        stat = os.stat(img_path)
+        thumb = _thumb_path(img_path, stat)
+        if not thumb.exists():
+            _make_thumb(img_path, thumb)
+        return thumb
+    except Exception:
+        return img_path
+
+@functools.lru_cache(maxsize=256)
+def _thumb_bytes_cached(path_str, mtime_ns, size):
+    """按(路径, 修改时间, 大小)缓存的缩略图字节"""
+    with open(path_str, "rb") as f:
+        return f.read()
+
+def _get_thumbnail_bytes(img_path):
+    """获取缩略图的原始字节，直接交给st.image，rerun时省去重复读盘和解码"""
+    thumb = _get_thumbnail(img_path)
+    try:
+        stat = os.stat(thumb)
+        return _thumb_bytes_cached(os.fspath(thumb), stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return str(thumb)
+
+@functools.lru_cache(maxsize=256)
+def _image_info_cached(path_str, mtime_ns):
+    """按(路径, 修改时间)缓存的图片元数据: (宽, 高, 格式, 模式)"""
+    with Image.open(path_str) as img:
+        return img.size[0], img.size[1], img.format or "未知", img.mode
 
 def get_image_dimensions(img_path):
     """获取图片的宽高比"""
@@ -25,18 +113,9 @@ def get_image_dimensions(img_path):
     except Exception:
         return 1.0  # 默认为正方形
 
-def create_masonry_gallery(images):
-    """
-    创建瀑布流布局图片画廊 - 使用原生Streamlit组件
-
-    Args:
-        images (list): 图片路径列表
-    """
-    if not images:
-        st.info("暂无图片")
-        return
-
-    # 使用CSS美化图片网格
+@st.cache_resource
+def _inject_gallery_css():
+    """一次性注入图片网格CSS（缓存命中时由Streamlit回放元素）"""
     st.markdown("""
     <style>
     /* 图片网格样式 */
@@ -112,8 +191,53 @@ def create_masonry_gallery(images):
     }
     </style>
     """, unsafe_allow_html=True)
+    return True
+
+def create_masonry_gallery(images):
+    """
+    创建瀑布流布局图片画廊 - 使用原生Streamlit组件
+
+    Args:
+        images (list): 图片路径列表
+    """
+    if not images:
+        st.info("暂无图片")
+        return
+
+    # 注入一次CSS样式（缓存后Streamlit自动回放，省去每次rerun约3KB的样式传输）
+    _inject_gallery_css()
+
+    # 首次加载时并行生成缺失的缩略图
+    # JPEG/PNG解码和缩放会释放GIL，多线程可随核心数近线性扩展
+    missing = []
+    for img_path in images:
+        try:
+            if not _thumb_path(img_path, os.stat(img_path)).exists():
+                missing.append(img_path)
+        except OSError:
+            pass
+    if missing:
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            list(executor.map(_get_thumbnail, missing))
+
+    # 优先使用streamlit-image-select：整页只有一个选择widget，
+    # 而不是每张图附带一个按钮（60张图即60个widget的序列化开销）
+    if image_select is not None:
+        thumbs = [str(_get_thumbnail(p)) for p in images]
+        captions = [p.name.split('_')[-1] if '_' in p.name else p.name for p in images]
+        selected = image_select(
+            "",
+            images=thumbs,
+            captions=captions,
+            use_container_width=True,
+            return_value="index",
+            key="gallery_select"
+        )
+        if selected is not None:
+            st.query_params["selected_image"] = str(selected)
+        return True
 
-    # 使用Streamlit的原生列布局创建网格
+    # 回退方案：使用Streamlit的原生列布局创建网格
     # 每行3列，创建瀑布流效果
     num_cols = 3
     rows = [st.columns(num_cols) for _ in range((len(images) + num_cols - 1) // num_cols)]
@@ -130,32 +254,26 @@ def create_masonry_gallery(images):
             img_name = img_path.name
             display_name = img_name.split('_')[-1] if '_' in img_name else img_name
 
-            # 创建缩略图
+            # 显示缩略图字节（内存缓存命中时完全跳过读盘和原图解码）
             try:
-                # 打开图片并创建缩略图
-                with Image.open(img_path) as img:
-                    # 保持原始宽高比，但限制最大尺寸
-                    img.thumbnail((300, 300), Image.LANCZOS)
-
-                    # 显示图片
-                    st.image(
-                        img,
-                        caption=display_name,
-                        use_container_width=True
-                    )
-
-                    # 添加点击功能
-                    is_selected = st.button(
-                        f"选择 #{i+1}",
-                        key=f"select_img_{i}",
-                        help=f"选择图片: {display_name}"
-                    )
-
-                    # 如果选择了图片，返回索引
-                    if is_selected:
-                        # 使用查询参数而不是session_state
-                        st.query_params["selected_image"] = str(i)
-                        st.rerun()
+                st.image(
+                    _get_thumbnail_bytes(img_path),
+                    caption=display_name,
+                    use_container_width=True
+                )
+
+                # 添加点击功能
+                is_selected = st.button(
+                    f"选择 #{i+1}",
+                    key=f"select_img_{i}",
+                    help=f"选择图片: {display_name}"
+                )
+
+                # 如果选择了图片，返回索引
+                if is_selected:
+                    # 使用查询参数而不是session_state
+                    st.query_params["selected_image"] = str(i)
+                    st.rerun()
             except Exception as e:
                 st.error(f"加载图片 {img_name} 时出错: {str(e)}")
 
@@ -205,13 +323,18 @@ def image_actions_section(images, selected_idx):
 
     selected_img = images[selected_idx]
 
-    # 获取图片信息
+    # 预先计算各分支重复使用的路径属性，避免在按钮分支里反复调用Path方法
+    img_name = selected_img.name
+    img_ext = selected_img.suffix[1:]
+    img_abs_path = str(selected_img.absolute())
+
+    # 获取图片信息（单次stat调用 + 按mtime缓存的PIL元数据，避免每次rerun重复解码）
+    stat = None
     try:
-        with Image.open(selected_img) as img:
-            width, height = img.size
-            format_name = img.format or "未知"
-            mode = img.mode
-            file_size = selected_img.stat().st_size / 1024  # KB
+        stat = os.stat(selected_img)
+        file_size = stat.st_size / 1024  # KB
+        width, height, format_name, mode = _image_info_cached(
+            os.fspath(selected_img), stat.st_mtime_ns)
     except Exception as e:
         width, height = 0, 0
         format_name = "无法读取"
@@ -220,7 +343,7 @@ def image_actions_section(images, selected_idx):
         st.error(f"读取图片信息失败: {str(e)}")
 
     # 显示选中的图片
-    st.image(str(selected_img), caption=selected_img.name, use_container_width=True)
+    st.image(str(selected_img), caption=img_name, use_container_width=True)
 
     # 显示图片详细信息
     info_col1, info_col2, info_col3 = st.columns(3)
@@ -231,8 +354,8 @@ def image_actions_section(images, selected_idx):
     with info_col3:
         st.metric("文件大小", f"{file_size:.1f} KB")
 
-    # 创建时间信息
-    creation_time = datetime.fromtimestamp(selected_img.stat().st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+    # 创建时间信息（复用上面的stat结果）
+    creation_time = datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S") if stat else "未知"
     st.caption(f"创建时间: {creation_time}")
 
     # 操作按钮分组
@@ -243,7 +366,6 @@ def image_actions_section(images, selected_idx):
         if st.button("📋 复制图片链接", help="生成并复制图片的Base64数据URL"):
             try:
                 img_base64 = get_image_base64(selected_img)
-                data_url = f"data:image/{selected_img.suffix[1:]};base64,{img_base64}"
 
                 # 显示不同格式的链接选项
                 link_type = st.radio(
@@ -252,12 +374,18 @@ def image_actions_section(images, selected_idx):
                     horizontal=True
                 )
 
+                # 用join一次性拼接：base64可能长达数MB，f-string嵌套会产生多份整串拷贝
                 if link_type == "HTML图片标签":
-                    code = f'<img src="{data_url}" alt="{selected_img.name}" width="{width}" height="{height}">'
+                    code = "".join([
+                        f'<img src="data:image/{img_ext};base64,', img_base64,
+                        f'" alt="{img_name}" width="{width}" height="{height}">',
+                    ])
                 elif link_type == "Markdown格式":
-                    code = f'![{selected_img.name}]({data_url})'
+                    code = "".join([
+                        f'![{img_name}](data:image/{img_ext};base64,', img_base64, ')',
+                    ])
                 else:
-                    code = data_url
+                    code = "".join([f"data:image/{img_ext};base64,", img_base64])
 
                 st.code(code, language="html")
                 st.success("已生成图片链接，可以复制使用")
@@ -265,15 +393,12 @@ def image_actions_section(images, selected_idx):
                 st.error(f"生成链接失败: {str(e)}")
 
     with action_col2:
-        # 下载图片
-        with open(selected_img, "rb") as file:
-            file_content = file.read()
-
+        # 下载图片：传入回调懒加载文件内容，仅在用户真正点击下载时才读盘
         st.download_button(
             label="💾 下载图片",
-            data=file_content,
-            file_name=selected_img.name,
-            mime=f"image/{selected_img.suffix[1:]}",
+            data=lambda p=selected_img: p.read_bytes(),
+            file_name=img_name,
+            mime=f"image/{img_ext}",
             help="将图片下载到本地"
         )
 
@@ -284,7 +409,7 @@ def image_actions_section(images, selected_idx):
             if confirm:
                 try:
                     os.remove(selected_img)
-                    st.success(f"已删除图片: {selected_img.name}")
+                    st.success(f"已删除图片: {img_name}")
                     st.rerun()
                 except Exception as e:
                     st.error(f"删除图片失败: {str(e)}")
@@ -298,11 +423,13 @@ def image_actions_section(images, selected_idx):
     with preview_col1:
         if st.button("🔍 查看原始大小", help="在新窗口中查看原始大小的图片"):
             # 创建一个临时HTML文件用于查看原图
-            html_content = f"""
+            # base64段单独作为join的一个元素，避免f-string再整体复制一遍MB级字符串
+            html_content = "".join([
+                f"""
             <!DOCTYPE html>
             <html>
             <head>
-                <title>{selected_img.name} - 原始大小预览</title>
+                <title>{img_name} - 原始大小预览</title>
                 <style>
                     body {{ margin: 0; padding: 20px; background: #f0f0f0; text-align: center; }}
                     img {{ max-width: 100%; height: auto; border: 1px solid #ddd; }}
@@ -310,18 +437,21 @@ def image_actions_section(images, selected_idx):
                 </style>
             </head>
             <body>
-                <h3>{selected_img.name} ({width}×{height}px)</h3>
-                <img src="data:image/{selected_img.suffix[1:]};base64,{get_image_base64(selected_img)}" alt="{selected_img.name}">
+                <h3>{img_name} ({width}×{height}px)</h3>
+                <img src="data:image/{img_ext};base64,""",
+                get_image_base64(selected_img),
+                f"""" alt="{img_name}">
             </body>
             </html>
-            """
+            """,
+            ])
             st.components.v1.html(html_content, height=500, scrolling=True)
 
     with preview_col2:
         # 图片信息显示
         st.text_area(
             "图片路径",
-            value=str(selected_img.absolute()),
+            value=img_abs_path,
             height=100,
             help="图片在系统中的完整路径"
         )
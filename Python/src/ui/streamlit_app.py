@@ -12,6 +12,7 @@ from datetime import datetime
 import streamlit as st
 from PIL import Image
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
 # 添加当前目录到Python路径，以便能够导入模块
@@ -22,12 +23,16 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 # 现在可以导入模块了
 from src.utils.helpers import ensure_dir_exists, is_image_file, load_paths_from_config
 from src.utils.prompt import get_generation_prompt, USER_PROMPTS
-from src.api.doubao_api import DoubaoAPI
+from src.api import doubao_api
 from src.ui.components import create_masonry_gallery, image_upload_section, image_actions_section
 
 # 加载环境变量
 load_dotenv()
 
+# 模块级会话：复用连接池，避免每次下载都重新进行DNS解析和TLS握手
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=8))
+
 # 配置日志
 # 使用相对路径而不是绝对路径，提高环境适应性
 current_dir = Path(__file__).parent  # ui目录
@@ -99,14 +104,70 @@ directories = {
     "Temp": python_dir / "temp"  # 临时目录，用于存储上传的临时文件
 }
 
-# 检查并创建所有目录
-for name, path in directories.items():
+@st.cache_resource
+def _ensure_dirs():
+    """检查并创建所有目录（进程内只执行一次，rerun时不再逐个stat目录）"""
+    for name, path in directories.items():
+        try:
+            ensure_dir_exists(path)
+            logger.info("%s 目录已确认存在: %s", name, path)
+        except Exception as e:
+            logger.error("创建 %s 目录时出错: %s", name, str(e))
+            st.error(f"创建 {name} 目录时出错: {str(e)}")  # 在UI中显示错误
+    return True
+
+_ensure_dirs()
+
+@st.cache_data(ttl=10, show_spinner=False)
+def _scan_image_files_cached(dir_str, dir_mtime_ns):
+    """
+    按(目录, 目录修改时间)缓存的扫描实现
+    目录中增删文件会改变目录mtime，缓存随之自动失效
+
+    Args:
+        dir_str (str): 目录路径
+        dir_mtime_ns (int): 目录的修改时间（纳秒），仅用于构成缓存键
+
+    Returns:
+        list: 按修改时间倒序排列的(小写文件名, Path)对列表
+    """
+    with os.scandir(dir_str) as it:
+        entries = [e for e in it if e.is_file() and is_image_file(e.name)]
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    # 同时缓存小写文件名，搜索过滤无需每次rerun重新lower()
+    return [(e.name.lower(), Path(e.path)) for e in entries]
+
+def _scan_image_entries(directory):
+    """
+    扫描目录，返回(小写文件名, Path)对列表，供搜索过滤直接使用
+
+    Args:
+        directory (Path): 要扫描的目录
+
+    Returns:
+        list: 按修改时间倒序排列的(小写文件名, Path)对列表
+    """
+    directory = Path(directory)
     try:
-        ensure_dir_exists(path)
-        logger.info(f"{name} 目录已确认存在: {path}")
-    except Exception as e:
-        logger.error(f"创建 {name} 目录时出错: {str(e)}")
-        st.error(f"创建 {name} 目录时出错: {str(e)}")  # 在UI中显示错误
+        dir_mtime_ns = directory.stat().st_mtime_ns
+    except OSError:
+        dir_mtime_ns = 0
+    return _scan_image_files_cached(str(directory), dir_mtime_ns)
+
+def _scan_image_files(directory):
+    """
+    扫描目录中的所有图片文件，按修改时间倒序返回
+
+    使用os.scandir复用DirEntry缓存的stat信息，比glob+逐个stat少一半系统调用；
+    目录未变化时直接命中Streamlit缓存，完全跳过扫描
+
+    Args:
+        directory (Path): 要扫描的目录
+
+    Returns:
+        list: 按修改时间倒序排列的图片Path列表
+    """
+    return [path for _, path in _scan_image_entries(directory)]
 
 def get_image_pairs():
     """
@@ -116,11 +177,13 @@ def get_image_pairs():
         list: 包含(原始图片路径, 生成图片路径)元组的列表
     """
     # 获取所有生成的图片
-    generated_images = sorted(
-        [f for f in OUTPUTS_DIR.glob("*") if is_image_file(f)],
-        key=lambda x: x.stat().st_mtime,
-        reverse=True
-    )
+    generated_images = _scan_image_files(OUTPUTS_DIR)
+
+    # 一次scandir取出截图目录的全部文件名，用集合查找替代逐图exists()系统调用
+    try:
+        screenshot_names = {entry.name for entry in os.scandir(SCREENSHOTS_DIR)}
+    except OSError:
+        screenshot_names = set()
 
     # 提取原始图片名称
     pairs = []
@@ -130,10 +193,9 @@ def get_image_pairs():
         parts = gen_img.name.split("_", 2)
         if len(parts) >= 3:
             original_name = parts[2]
-            original_path = SCREENSHOTS_DIR / original_name
 
-            if original_path.exists():
-                pairs.append((original_path, gen_img))
+            if original_name in screenshot_names:
+                pairs.append((SCREENSHOTS_DIR / original_name, gen_img))
             else:
                 # 如果原始图片不存在，只显示生成的图片
                 pairs.append((None, gen_img))
@@ -143,19 +205,14 @@ def get_image_pairs():
 def get_image_gallery():
     """获取图床中的所有图片"""
     # 获取Outputs文件夹中的所有图片
-    image_files = sorted(
-        [f for f in OUTPUTS_DIR.glob("*") if is_image_file(f)],
-        key=lambda x: x.stat().st_mtime,
-        reverse=True
-    )
-    return image_files
+    return _scan_image_files(OUTPUTS_DIR)
 
 def create_image_request():
     """创建图片生成请求部分"""
     st.header("创建图片生成请求")
 
-    # 创建API客户端
-    api = DoubaoAPI()
+    # 获取共享的API客户端（每次rerun新建实例会泄漏未关闭的连接池）
+    api = doubao_api.get_instance()
 
     # 上传图片
     uploaded_file = st.file_uploader("上传图片", type=["jpg", "jpeg", "png"])
@@ -220,8 +277,9 @@ def create_image_request():
                             # 显示生成的图片
                             st.success("图片生成成功！")
 
-                            # 下载并显示图片
-                            response = requests.get(url)
+                            # 下载并显示图片（复用模块级会话的连接池）
+                            response = _SESSION.get(url, timeout=30)
+                            response.raise_for_status()
                             img = Image.open(io.BytesIO(response.content))
                             st.image(img, caption="生成的图片", use_container_width=True)
 
@@ -267,21 +325,22 @@ def image_gallery():
             index=0
         )
 
-    # 应用筛选和排序
+    # 应用筛选和排序（在缓存的小写文件名上做子串匹配，省去每次rerun的N次lower()）
     if search_term:
-        filtered_images = [img for img in images if search_term.lower() in img.name.lower()]
+        needle = search_term.lower()
+        filtered_images = [path for name_lower, path in _scan_image_entries(OUTPUTS_DIR)
+                           if needle in name_lower]
     else:
         filtered_images = images.copy()
 
-    # 排序
-    if sort_option == "最新优先":
-        filtered_images.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-    elif sort_option == "最旧优先":
-        filtered_images.sort(key=lambda x: x.stat().st_mtime)
+    # 排序（扫描结果本身已按修改时间倒序，时间排序无需再对每个文件stat）
+    if sort_option == "最旧优先":
+        filtered_images.reverse()
     elif sort_option == "名称升序":
         filtered_images.sort(key=lambda x: x.name)
     elif sort_option == "名称降序":
         filtered_images.sort(key=lambda x: x.name, reverse=True)
+    # "最新优先"保持扫描时的倒序，无需处理
 
     # 显示图片统计信息
     if search_term and len(filtered_images) < len(images):
@@ -489,10 +548,15 @@ def main():
 
                 st.markdown("---")
 
-    # 自动刷新
+    # 自动刷新：优先使用st_autorefresh在客户端调度，不阻塞服务器线程
     if auto_refresh:
-        time.sleep(refresh_interval)
-        st.rerun()
+        try:
+            from streamlit_autorefresh import st_autorefresh
+            st_autorefresh(interval=refresh_interval * 1000, key="auto_ref")
+        except ImportError:
+            # 未安装streamlit-autorefresh时回退到阻塞式刷新
+            time.sleep(refresh_interval)
+            st.rerun()
 
 if __name__ == "__main__":
     main()
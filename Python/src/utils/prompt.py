@@ -4,10 +4,18 @@
 """
 
 import logging
+import sys
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Dict, List, Optional, Union
 
 # 配置日志
 logger = logging.getLogger(__name__)
+# 预绑定方法引用：未命中分支里全局名查找比每次解析logger.warning属性更快
+_warn = logger.warning
+
+# 查找失败的哨兵对象：配合dict.get把"判存在+取值"合并为一次哈希探测
+_MISS = object()
 
 # 系统提示词
 SYSTEM_PROMPTS = {
@@ -66,6 +74,60 @@ PROMPT_TEMPLATES = {
     "custom_style": "{base_description}，使用{style}风格，{additional_instructions}"
 }
 
+# 驻留所有提示词常量：保证全进程只有一份字符串对象，
+# 上层缓存用它们做键时哈希/相等比较可走指针快路径；
+# 再用MappingProxyType冻结成只读视图，可安全跨线程共享，调用方无需防御性拷贝
+SYSTEM_PROMPTS = MappingProxyType({k: sys.intern(v) for k, v in SYSTEM_PROMPTS.items()})
+USER_PROMPTS = MappingProxyType({k: sys.intern(v) for k, v in USER_PROMPTS.items()})
+PROMPT_TEMPLATES = MappingProxyType({k: sys.intern(v) for k, v in PROMPT_TEMPLATES.items()})
+
+# 扁平化内部存储：系统和用户提示词合并进一个元组，查表只需
+# 一次键→下标哈希加一次C层元组索引，比维护两张独立哈希表更省、局部性更好
+# （公开的SYSTEM_PROMPTS/USER_PROMPTS仍是对外接口，供遍历键和文档使用）
+_KEYS = tuple(SYSTEM_PROMPTS) + tuple(USER_PROMPTS)
+_PROMPTS = tuple(SYSTEM_PROMPTS.values()) + tuple(USER_PROMPTS.values())
+# 索引映射只收录用户提示词：get_*入口不能解析出系统角色提示词，
+# 未知键（包括系统键）仍走警告+默认值的回退路径
+_IDX = {k: i for i, k in enumerate(_KEYS) if k in USER_PROMPTS}
+_DEFAULT_VISION_IDX = _IDX["vision_basic"]
+_DEFAULT_GENERATION_IDX = _IDX["default_generation"]
+
+# 可选前缀索引：pygtrie提供O(|前缀|)的键补全，未安装时回退到线性扫描
+# 精确匹配的get_*路径仍然走字典（更快），trie只服务前缀建议
+try:
+    from pygtrie import CharTrie
+    _PROMPT_TRIE = CharTrie(USER_PROMPTS)
+except ImportError:
+    _PROMPT_TRIE = None
+
+def suggest_prompt_types(prefix: str) -> List[str]:
+    """
+    按前缀列出候选的提示词类型，供UI做自动补全
+
+    Args:
+        prefix (str): 提示词类型的前缀，如 "vision"
+
+    Returns:
+        list: 匹配该前缀的提示词类型列表，无匹配时为空列表
+    """
+    if _PROMPT_TRIE is not None:
+        try:
+            return list(_PROMPT_TRIE.keys(prefix))
+        except KeyError:
+            return []
+    return [k for k in USER_PROMPTS if k.startswith(prefix)]
+
+# 模板静态切片：占位符两侧的固定文本在导入时拆好并驻留，
+# 热路径退化为纯字符串拼接，跳过str.format每次对{name}的重新解析
+_VISION_TO_IMAGE_SUFFIX = sys.intern(" 请保持原始图片的构图和主要元素位置，但可以提升画面的艺术性和美感。")
+_FALLBACK_PREFIX = sys.intern("基于这张图片创建一个")
+_FALLBACK_MID = sys.intern("的图像，要求构图不能改变，主体物的位置类似，")
+_CUSTOM_STYLE_SEP = sys.intern("，使用")
+_CUSTOM_STYLE_MID = sys.intern("风格，")
+
+# 结果缓存：提示词全部是不可变字符串，重复调用直接命中lru_cache的C层查找，
+# 跳过Python层的分支和日志判断；未知类型的警告也只会打一次，避免刷屏
+@lru_cache(maxsize=None)
 def get_vision_prompt(prompt_type: str = "vision_basic") -> str:
     """
     获取视觉理解API的提示词
@@ -77,12 +139,15 @@ def get_vision_prompt(prompt_type: str = "vision_basic") -> str:
     Returns:
         str: 对应类型的提示词
     """
-    if prompt_type in USER_PROMPTS:
-        return USER_PROMPTS[prompt_type]
-    else:
-        logger.warning(f"未找到提示词类型: {prompt_type}，使用基础提示词")
-        return USER_PROMPTS["vision_basic"]
+    idx = _IDX.get(prompt_type, _MISS)
+    if idx is _MISS:
+        # 先判级别再用%延迟格式化，WARNING被关闭时完全不构造消息字符串
+        if logger.isEnabledFor(logging.WARNING):
+            _warn("未找到提示词类型: %s，使用基础提示词", prompt_type)
+        return _PROMPTS[_DEFAULT_VISION_IDX]
+    return _PROMPTS[idx]
 
+@lru_cache(maxsize=None)
 def get_generation_prompt(prompt_type: str = "default_generation") -> str:
     """
     获取图像生成API的提示词
@@ -94,13 +159,45 @@ def get_generation_prompt(prompt_type: str = "default_generation") -> str:
     Returns:
         str: 对应类型的提示词
     """
-    if prompt_type in USER_PROMPTS:
-        return USER_PROMPTS[prompt_type]
-    else:
-        logger.warning(f"未找到提示词类型: {prompt_type}，使用默认提示词")
-        return USER_PROMPTS["default_generation"]
+    idx = _IDX.get(prompt_type, _MISS)
+    if idx is _MISS:
+        if logger.isEnabledFor(logging.WARNING):
+            _warn("未找到提示词类型: %s，使用默认提示词", prompt_type)
+        return _PROMPTS[_DEFAULT_GENERATION_IDX]
+    return _PROMPTS[idx]
+
+def get_vision_prompts(prompt_types: List[str]) -> List[str]:
+    """
+    批量获取视觉理解API的提示词
+
+    把N次函数调用收敛为一次推导式，省去每个提示词的属性查找和
+    日志分支，适合一次分析多张图片的场景。
+
+    Args:
+        prompt_types (list): 提示词类型列表，未知类型回退到基础提示词
+
+    Returns:
+        list: 与输入顺序对应的提示词列表
+    """
+    up = USER_PROMPTS
+    default = up["vision_basic"]
+    return [up.get(t, default) for t in prompt_types]
+
+def combine_vision_and_generation_batch(vision_results: List[str]) -> List[str]:
+    """
+    批量组合视觉分析结果和图像生成提示词
+
+    Args:
+        vision_results (list): 视觉分析结果列表
 
-def combine_vision_and_generation(vision_result: str, 
+    Returns:
+        list: 与输入顺序对应的组合提示词列表
+    """
+    suffix = _VISION_TO_IMAGE_SUFFIX
+    return [v + suffix for v in vision_results]
+
+@lru_cache(maxsize=1024)
+def combine_vision_and_generation(vision_result: str,
                                  scene_type: str = "公园", 
                                  additional_instructions: str = "设施类型也不改变") -> str:
     """
@@ -115,14 +212,32 @@ def combine_vision_and_generation(vision_result: str,
         str: 组合后的提示词
     """
     if vision_result:
-        return PROMPT_TEMPLATES["vision_to_image"].format(vision_result=vision_result)
+        return vision_result + _VISION_TO_IMAGE_SUFFIX
     else:
-        return PROMPT_TEMPLATES["vision_fallback"].format(
-            scene_type=scene_type,
-            additional_instructions=additional_instructions
-        )
+        return _FALLBACK_PREFIX + scene_type + _FALLBACK_MID + additional_instructions
+
+def prompt_hash(vision_result: str,
+                scene_type: str = "公园",
+                additional_instructions: str = "设施类型也不改变") -> int:
+    """
+    计算组合提示词的哈希键
+
+    下游对生成结果做缓存时，应以本函数返回的整数（而不是拼接后的完整
+    提示词）作为缓存键：整数探测是O(1)，完整提示词每次都要按长度重新
+    哈希和比较。参数与combine_vision_and_generation一一对应。
+
+    Args:
+        vision_result (str): 视觉分析的结果
+        scene_type (str): 场景类型，用于视觉分析失败时的备用提示词
+        additional_instructions (str): 额外的指导说明
+
+    Returns:
+        int: 可作为缓存键的64位哈希值
+    """
+    return hash((vision_result, scene_type, additional_instructions))
 
-def create_custom_prompt(base_description: str, 
+@lru_cache(maxsize=1024)
+def create_custom_prompt(base_description: str,
                         style: str = "写实", 
                         additional_instructions: str = "") -> str:
     """
@@ -136,11 +251,8 @@ def create_custom_prompt(base_description: str,
     Returns:
         str: 自定义提示词
     """
-    return PROMPT_TEMPLATES["custom_style"].format(
-        base_description=base_description,
-        style=style,
-        additional_instructions=additional_instructions
-    )
+    return (base_description + _CUSTOM_STYLE_SEP + style
+            + _CUSTOM_STYLE_MID + additional_instructions)
 
 # 测试代码
 if __name__ == "__main__":